@@ -4,9 +4,10 @@ import textwrap
 
 import pandas as pd
 import streamlit as st
-import pydeck as pdk
 import h3
 
+from map_layers import TOP_N, make_pydeck_layer
+
 # -----------------------------
 # Config & constants
 # -----------------------------
@@ -16,10 +17,8 @@ st.set_page_config(
 )
 
 DATA_PATH = "data/cate_by_h3_cells.csv"
-NYC_CENTER = (40.7128, -74.0060)
 
-# Tunable visual thresholds
-TOP_N = 30         # how many "kill zones" to glow red
+# Tunable visual thresholds (TOP_N, the number of "kill zones" to glow red, is in map_layers.py)
 TOP_N_TABLE = 10   # how many top cells to list explicitly
 
 # -----------------------------
@@ -50,76 +49,6 @@ def load_geocoded_data():
         return {}
 
 
-def make_pydeck_layer(df: pd.DataFrame) -> pdk.Deck:
-    """
-    Render H3 hexes with black borders over street map.
-    """
-    # Normalize CATE for color scaling
-    cate = df["cate_mean"]
-    cate_min, cate_max = cate.min(), cate.max()
-    span = max(cate_max - cate_min, 1e-6)
-    df = df.copy()
-    df["cate_norm"] = (df["cate_mean"] - cate_min) / span
-
-    def get_stroke_color(row):
-        """Border color - BLACK for all hexagons"""
-        return [0, 0, 0, 255]  # Solid black borders
-    
-    def get_fill_color(row):
-        """Fill color - transparent for all, subtle gray for top N selected"""
-        if row["rank_cate"] <= TOP_N:
-            # Subtle gray fill for selected high-risk zones
-            return [100, 100, 100, 80]  # Translucent gray
-        else:
-            # Completely transparent - see map underneath
-            return [0, 0, 0, 0]  # Fully transparent
-
-    df["stroke_color"] = df.apply(get_stroke_color, axis=1)
-    df["fill_color"] = df.apply(get_fill_color, axis=1)
-
-    layer = pdk.Layer(
-        "H3HexagonLayer",
-        data=df,
-        get_hexagon="h3_index",
-        get_fill_color="fill_color",
-        get_line_color="stroke_color",
-        auto_highlight=True,
-        pickable=True,
-        stroked=True,
-        filled=True,
-        extruded=False,
-        line_width_min_pixels=1.5,  # Thicker borders to be visible
-        opacity=1.0,  # Full opacity (transparency is in the colors themselves)
-    )
-
-    # Standard Mercator projection (like Google Maps) with no rotation
-    view_state = pdk.ViewState(
-        latitude=NYC_CENTER[0],
-        longitude=NYC_CENTER[1],
-        zoom=10.5,    # Slightly closer zoom
-        pitch=0,      # No tilt - standard flat map view
-        bearing=0,    # No rotation - north is always up
-        min_zoom=9,   # Prevent zooming out too far
-        max_zoom=16,  # Prevent zooming in too close
-    )
-
-    tooltip = {
-        "html": "<b>H3:</b> {h3_index}<br/>"
-                "<b>Mean CATE:</b> {cate_mean}<br/>"
-                "<b>Avg traffic:</b> {avg_traffic}<br/>"
-                "<b>Baseline risk:</b> {avg_baseline_risk}<br/>"
-                "<b>Total crashes:</b> {total_crashes}",
-        "style": {"backgroundColor": "black", "color": "white"},
-    }
-
-    return pdk.Deck(
-        layers=[layer],
-        initial_view_state=view_state,
-        tooltip=tooltip,
-        map_style="road",
-    )
-
-
 def render_experiment_markdown(top_cells: pd.DataFrame) -> str:
     """
     Create a switchback / geo‑split experiment description string
@@ -234,7 +163,7 @@ if view_mode == "🗺️ Map":
 
     with left:
         st.subheader("🗺️ NYC Rain Crash Risk - Kill Zones Map")
-        deck = make_pydeck_layer(df)
+        deck = make_pydeck_layer(df, top_n=TOP_N)
         # Use container with specific height
         st.pydeck_chart(deck, use_container_width=True)
         
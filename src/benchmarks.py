@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for the Pipeline Hot Paths
+==========================================
+
+Times the expensive steps of the notebooks on seeded synthetic data
+(`synthetic_data.py`), so performance changes have a baseline. Runs fully
+offline.
+
+Each benchmark mirrors the notebook code it stands in for:
+    panel_construction  02_b  cartesian (h3, date, hour) product + crash merge + time features
+    baseline_risk       02_b  lagged 30-hour rolling mean per cell
+    merge_weather       02_b  (date, hour) weather merge
+    merge_traffic       05    (h3_index, datetime) TLC merge
+    ipw_ate             04/05 propensity-score weighting ATE
+    tlearner_fit        06    two GradientBoostingRegressor fits on a <= 1M stratified sample
+    tlearner_predict    06    mu_1 - mu_0 on the sample
+    pydeck_layer        map_layers.py make_pydeck_layer (the dashboard map)
+
+Row counts differ from the scale name. Like 02_b, the panel chain only builds
+cells with at least one crash, over whole days, so at 1M it runs on ~787k rows;
+compare its timings on the reported `rows_out`. The model benchmarks use the
+full cells x hours panel (e.g. exactly 1,000,000 rows at 1M).
+
+Results are written as run reports (see `instrumentation.py`), one per scale,
+so two runs can be compared with:
+    python src/instrumentation.py compare old.json new.json
+
+Usage:
+    python src/benchmarks.py --scales 1M 10M
+    python src/benchmarks.py --scales 100M --only baseline_risk merge_traffic
+"""
+
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import REPORT_DIR, RunReport
+from synthetic_data import SCALES, config_for_scale, generate, make_panel
+
+# Configuration
+BASELINE_WINDOW = 30
+LAG = 1
+TLEARNER_SAMPLE = 1_000_000  # same cap as 06_CATE
+CONFOUNDERS = ["day_of_week", "is_weekend", "month", "is_rush_hour", "Baseline_Risk", "traffic_count"]
+X_FEATURES = ["log_traffic", "Baseline_Risk", "day_of_week", "is_weekend", "month", "is_rush_hour"]
+
+
+# -----------------------------
+# Notebook operations
+# -----------------------------
+def build_full_panel(dense: pd.DataFrame, weather: pd.DataFrame) -> pd.DataFrame:
+    """02_b: every (h3, date, hour) with crash counts and time features."""
+    unique_h3 = sorted(dense["h3"].dropna().unique())
+    date_hour = weather[["date", "hour"]].drop_duplicates().sort_values(["date", "hour"])
+    full_index = pd.MultiIndex.from_product(
+        [unique_h3, date_hour["date"].unique(), date_hour["hour"].unique()],
+        names=["h3_index", "date", "hour"],
+    )
+    full_panel = pd.DataFrame(index=full_index).reset_index()
+
+    crashes = dense[["h3", "date", "hour", "accidents_count"]].rename(columns={"h3": "h3_index"})
+    full_panel = full_panel.merge(crashes, on=["h3_index", "date", "hour"], how="left")
+    full_panel["accidents_count"] = full_panel["accidents_count"].fillna(0).astype(int)
+    full_panel["accident_indicator"] = (full_panel["accidents_count"] > 0).astype(int)
+
+    dt = pd.to_datetime(full_panel["date"].astype(str) + " " + full_panel["hour"].astype(int).astype(str) + ":00")
+    full_panel["day_of_week"] = dt.dt.weekday
+    full_panel["is_weekend"] = (full_panel["day_of_week"] >= 5).astype(int)
+    full_panel["month"] = dt.dt.month
+    full_panel["is_rush_hour"] = (
+        dt.dt.hour.isin([7, 8, 9, 16, 17, 18]) & ~full_panel["is_weekend"].astype(bool)
+    ).astype(int)
+    full_panel["Traffic_Proxy"] = 1 + full_panel["is_rush_hour"]
+    return full_panel
+
+
+def add_baseline_risk(full_panel: pd.DataFrame, window: int = BASELINE_WINDOW, lag: int = LAG) -> pd.DataFrame:
+    """02_b: lagged rolling mean of crash counts per cell."""
+    full_panel = full_panel.sort_values(["h3_index", "date", "hour"])
+    full_panel["accidents_count_shifted"] = full_panel.groupby("h3_index")["accidents_count"].shift(lag)
+    full_panel["Baseline_Risk"] = (
+        full_panel.groupby("h3_index")["accidents_count_shifted"]
+        .rolling(window, min_periods=1)
+        .mean()
+        .reset_index(level=0, drop=True)
+    )
+    return full_panel.drop(columns=["accidents_count_shifted"])
+
+
+def merge_weather(full_panel: pd.DataFrame, weather: pd.DataFrame) -> pd.DataFrame:
+    """02_b: attach rain_flag / precipitation by (date, hour)."""
+    full_panel = full_panel.merge(weather[["date", "hour", "rain_flag", "precipitation"]], on=["date", "hour"], how="left")
+    full_panel["rain_flag"] = full_panel["rain_flag"].fillna(0).astype(int)
+    return full_panel
+
+
+def merge_traffic(panel: pd.DataFrame, traffic: pd.DataFrame) -> pd.DataFrame:
+    """05: attach TLC traffic_count by (h3_index, datetime)."""
+    panel = panel.copy()
+    panel["date"] = pd.to_datetime(panel["date"])
+    panel["datetime"] = panel["date"] + pd.to_timedelta(panel["hour"], unit="h")
+    df = panel.merge(
+        traffic[["h3_index", "match_hour", "traffic_count"]],
+        left_on=["h3_index", "datetime"],
+        right_on=["h3_index", "match_hour"],
+        how="left",
+    )
+    df["traffic_count"] = df["traffic_count"].fillna(0)
+    return df.drop(columns=["Traffic_Proxy", "match_hour"], errors="ignore")
+
+
+def ipw_ate(df: pd.DataFrame, confounders: List[str] = CONFOUNDERS) -> float:
+    """
+    04/05: ATE of rain_flag on accident_indicator by inverse propensity
+    weighting with a logistic propensity model (DoWhy's
+    `backdoor.propensity_score_weighting` with normalized IPS weights).
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    X = df[confounders].to_numpy(dtype=float)
+    T = df["rain_flag"].to_numpy()
+    Y = df["accident_indicator"].to_numpy()
+    ps = LogisticRegression().fit(X, T).predict_proba(X)[:, 1]
+    w1 = T / ps
+    w0 = (1 - T) / (1 - ps)
+    return float((w1 * Y).sum() / w1.sum() - (w0 * Y).sum() / w0.sum())
+
+
+def stratified_sample(df: pd.DataFrame, sample_size: int = TLEARNER_SAMPLE, seed: int = 42) -> pd.DataFrame:
+    """06: equal-sized rain / no-rain sample capped at `sample_size`."""
+    half = min(sample_size, len(df)) // 2
+    return pd.concat(
+        [x.sample(n=min(len(x), half), random_state=seed) for _, x in df.groupby("rain_flag")]
+    )
+
+
+def tlearner_fit(df_sample: pd.DataFrame):
+    """06: one GradientBoostingRegressor per treatment arm."""
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    X = df_sample[X_FEATURES]
+    T = df_sample["rain_flag"]
+    Y = df_sample["accident_indicator"]
+    models = []
+    for arm in (0, 1):
+        model = GradientBoostingRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42)
+        model.fit(X[T == arm], Y[T == arm])
+        models.append(model)
+    return models
+
+
+def tlearner_predict(models, df_sample: pd.DataFrame) -> np.ndarray:
+    """06: CATE = mu_1 - mu_0."""
+    X = df_sample[X_FEATURES]
+    return models[1].predict(X) - models[0].predict(X)
+
+
+# -----------------------------
+# Suite
+# -----------------------------
+BENCHMARKS = [
+    "panel_construction",
+    "baseline_risk",
+    "merge_weather",
+    "merge_traffic",
+    "ipw_ate",
+    "tlearner_fit",
+    "tlearner_predict",
+    "pydeck_layer",
+]
+
+
+def run_scale(
+    scale: str,
+    only: Optional[List[str]] = None,
+    seed: int = 42,
+    tlearner_sample: int = TLEARNER_SAMPLE,
+    report_dir: Path = REPORT_DIR,
+) -> RunReport:
+    """Run the selected benchmarks on one synthetic scale and return the report."""
+    selected = set(only or BENCHMARKS)
+    cfg = config_for_scale(scale, seed=seed)
+    report = RunReport(f"benchmark_{scale}", report_dir=report_dir)
+    print(f"=== Scale {scale}: {cfg.n_cells:,} cells × {cfg.n_hours:,} hours = {cfg.n_rows:,} rows ===")
+
+    with report.stage("generate") as s:
+        data = generate(cfg, include_panel=False)
+        # Raw event tables only; the panels are built by the benchmarks below
+        s.rows_out = len(data["crashes"]) + len(data["traffic"])
+
+    # 02_b chain: each step feeds the next, so upstream steps run (and are reported) too
+    panel_steps = ["panel_construction", "baseline_risk", "merge_weather", "merge_traffic"]
+    if selected & set(panel_steps):
+        dense, weather = data["dense"], data["weather"]
+        last = max(panel_steps.index(b) for b in selected if b in panel_steps)
+        with report.stage("panel_construction", rows_in=len(dense)) as s:
+            panel = build_full_panel(dense, weather)
+            s.rows_out = len(panel)
+        if last >= 1:
+            with report.stage("baseline_risk", rows_in=len(panel)) as s:
+                panel = add_baseline_risk(panel)
+                s.rows_out = len(panel)
+        if last >= 2:
+            with report.stage("merge_weather", rows_in=len(panel)) as s:
+                panel = merge_weather(panel, weather)
+                s.rows_out = len(panel)
+        if last >= 3:
+            with report.stage("merge_traffic", rows_in=len(panel)) as s:
+                panel = merge_traffic(panel, data["traffic"])
+                s.rows_out = len(panel)
+
+    model_steps = {"ipw_ate", "tlearner_fit", "tlearner_predict"}
+    if selected & model_steps:
+        try:
+            import sklearn  # noqa: F401
+        except ImportError:
+            print("⚠️  scikit-learn not installed, skipping model benchmarks")
+            selected -= model_steps
+
+    if selected & model_steps:
+        # Model inputs come from the numpy-built panel so they don't depend on the chain
+        # above; drop the chain's output first so both panels aren't held at once
+        panel = None
+        analysis = make_panel(cfg, data)
+        analysis["log_traffic"] = np.log1p(analysis["traffic_count"])
+        if "ipw_ate" in selected:
+            with report.stage("ipw_ate", rows_in=len(analysis)):
+                ate = ipw_ate(analysis)
+            print(f"   ATE: {ate:.6f}")
+        if selected & {"tlearner_fit", "tlearner_predict"}:
+            df_sample = stratified_sample(analysis, tlearner_sample, seed)
+            with report.stage("tlearner_fit", rows_in=len(df_sample)):
+                models = tlearner_fit(df_sample)
+            if "tlearner_predict" in selected:
+                with report.stage("tlearner_predict", rows_in=len(df_sample)) as s:
+                    cate = tlearner_predict(models, df_sample)
+                    s.rows_out = len(cate)
+
+    if "pydeck_layer" in selected:
+        try:
+            from map_layers import make_pydeck_layer
+        except ImportError as e:
+            print(f"⚠️  pydeck not installed ({e}), skipping pydeck_layer")
+        else:
+            cate_df = data["cate_by_cell"]
+            cate_df["rank_cate"] = cate_df["cate_mean"].rank(method="dense", ascending=False).astype(int)
+            with report.stage("pydeck_layer", rows_in=len(cate_df)):
+                make_pydeck_layer(cate_df)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline hot paths on synthetic data.")
+    parser.add_argument("--scales", nargs="+", default=["1M"], choices=list(SCALES))
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="subset of benchmarks to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tlearner-sample", type=int, default=TLEARNER_SAMPLE)
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        report = run_scale(scale, args.only, args.seed, args.tlearner_sample)
+        report.save()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Stage Profiling & Memory Instrumentation
+========================================
+
+Structured replacement for the ad hoc `print` timings and the one-off
+`env_checks()` memory print in 02_b. Works the same from notebooks and scripts.
+
+For every stage or major operation (merge, rolling, fit, predict) it records:
+    wall time, CPU time, peak RSS, rows in/out, bytes read/written
+and optionally a sampling-profiler capture (pyinstrument, falling back to cProfile).
+
+Example (notebook):
+    import sys; sys.path.append('../src')
+    from instrumentation import RunReport
+
+    report = RunReport('02_b_h3_full_construction')
+    with report.stage('merge_crashes', rows_in=len(full_panel)) as s:
+        full_panel = full_panel.merge(dense, on=['h3_index', 'date', 'hour'], how='left')
+        s.rows_out = len(full_panel)
+    report.save()
+
+Each run is written as JSON to data/.pipeline/reports/<run>/<timestamp>.json.
+Two reports can be compared to flag regressions:
+    python src/instrumentation.py compare old.json new.json --tolerance 0.2
+"""
+
+import argparse
+import cProfile
+import functools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # optional: falls back to resource / no I/O counters
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Configuration
+REPORT_DIR = Path(__file__).resolve().parent.parent / "data" / ".pipeline" / "reports"
+RSS_SAMPLE_INTERVAL = 0.05  # seconds
+MB = 1024 ** 2
+
+# Metrics checked by `compare_reports`, with the minimum absolute change that
+# counts as a regression (so tiny stages don't flag on noise)
+COMPARED_METRICS = {"wall_s": 0.5, "cpu_s": 0.5, "peak_rss_mb": 50.0}
+
+
+# -----------------------------
+# Low-level probes
+# -----------------------------
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, if it can be measured."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    if resource is not None:
+        # ru_maxrss is the lifetime peak (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+def io_counters() -> Optional[tuple]:
+    """
+    (bytes_read, bytes_written) for this process, if the OS exposes them.
+
+    Prefers `read_chars`/`write_chars` (Linux: all read()/write() traffic,
+    including page-cache hits) over `read_bytes`/`write_bytes`, which only
+    count block-device I/O and stay at 0 for files already in cache.
+    """
+    if psutil is None:
+        return None
+    try:
+        io = psutil.Process().io_counters()
+    except (AttributeError, psutil.Error):
+        return None
+    return getattr(io, "read_chars", io.read_bytes), getattr(io, "write_chars", io.write_bytes)
+
+
+class _PeakRSSSampler(threading.Thread):
+    """Background thread that tracks the highest RSS seen while a stage runs."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def stop(self) -> Optional[int]:
+        self._stop_event.set()
+        self.join()
+        self._sample()
+        return self.peak
+
+
+# -----------------------------
+# Stage records
+# -----------------------------
+@dataclass
+class StageMetrics:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    rss_start_mb: Optional[float] = None
+    rss_end_mb: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+    profile_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+class _StageTimer:
+    """Context manager returned by `RunReport.stage`; set `rows_out` etc. inside the block."""
+
+    def __init__(self, report: "RunReport", name: str, rows_in: Optional[int], profile: bool):
+        self.report = report
+        self.metrics = StageMetrics(name=name, rows_in=rows_in)
+        self.profile = profile
+        self._profiler = None
+
+    @property
+    def rows_out(self) -> Optional[int]:
+        return self.metrics.rows_out
+
+    @rows_out.setter
+    def rows_out(self, value: int):
+        self.metrics.rows_out = int(value)
+
+    @property
+    def rows_in(self) -> Optional[int]:
+        return self.metrics.rows_in
+
+    @rows_in.setter
+    def rows_in(self, value: int):
+        self.metrics.rows_in = int(value)
+
+    def __enter__(self):
+        rss = current_rss()
+        self.metrics.rss_start_mb = rss / MB if rss is not None else None
+        self._io_start = io_counters()
+        self._sampler = _PeakRSSSampler()
+        self._sampler.start()
+        if self.profile:
+            self._profiler = _start_profiler()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        m = self.metrics
+        m.wall_s = time.perf_counter() - self._wall_start
+        m.cpu_s = time.process_time() - self._cpu_start
+        peak = self._sampler.stop()
+        m.peak_rss_mb = peak / MB if peak is not None else None
+        rss = current_rss()
+        m.rss_end_mb = rss / MB if rss is not None else None
+
+        io_end = io_counters()
+        if self._io_start is not None and io_end is not None:
+            m.bytes_read = io_end[0] - self._io_start[0]
+            m.bytes_written = io_end[1] - self._io_start[1]
+
+        if self._profiler is not None:
+            m.profile_path = _stop_profiler(self._profiler, self.report.profile_dir, m.name)
+        if exc_type is not None:
+            m.error = f"{exc_type.__name__}: {exc}"
+
+        self.report.stages.append(m)
+        if self.report.verbose:
+            print(format_stage(m))
+        return False
+
+
+class RunReport:
+    """
+    Collects `StageMetrics` for one run of a notebook or script.
+
+    Args:
+        run: Name of the run (usually the notebook / script name)
+        report_dir: Where `save()` writes JSON reports
+        profile: Capture a sampling profile for every stage by default
+        verbose: Print a one-line summary as each stage finishes
+    """
+
+    def __init__(self, run: str, report_dir: Path = REPORT_DIR, profile: bool = False, verbose: bool = True):
+        self.run = run
+        self.report_dir = Path(report_dir)
+        self.profile = profile
+        self.verbose = verbose
+        self.started_at = datetime.now()
+        self.stages: List[StageMetrics] = []
+
+    @property
+    def profile_dir(self) -> Path:
+        return self.report_dir / self.run / f"profiles_{self.started_at:%Y%m%d_%H%M%S}"
+
+    def stage(self, name: str, rows_in: Optional[int] = None, profile: Optional[bool] = None) -> _StageTimer:
+        return _StageTimer(self, name, rows_in, self.profile if profile is None else profile)
+
+    def instrument(self, name: Optional[str] = None, profile: Optional[bool] = None):
+        """
+        Decorator version of `stage`. Rows in/out are taken from the `len()` of
+        the first argument and of the return value when they support it.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                rows_in = _safe_len(args[0]) if args else None
+                with self.stage(name or func.__name__, rows_in=rows_in, profile=profile) as s:
+                    result = func(*args, **kwargs)
+                    rows_out = _safe_len(result)
+                    if rows_out is not None:
+                        s.rows_out = rows_out
+                return result
+            return wrapper
+        return decorator
+
+    def to_dict(self) -> dict:
+        return {
+            "run": self.run,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "psutil": psutil is not None,
+            "total_wall_s": sum(s.wall_s for s in self.stages),
+            "stages": [asdict(s) for s in self.stages],
+        }
+
+    def save(self, path: Optional[str] = None) -> Path:
+        """Write the report as JSON and return the path."""
+        if path is None:
+            path = self.report_dir / self.run / f"{self.started_at:%Y%m%d_%H%M%S}.json"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        if self.verbose:
+            print(f"✓ Saved run report to {path}")
+        return path
+
+
+def _safe_len(obj) -> Optional[int]:
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+# -----------------------------
+# Sampling profiler
+# -----------------------------
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+
+def _stop_profiler(profiler, out_dir: Path, name: str) -> str:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        path = out_dir / f"{name}.prof"
+        profiler.dump_stats(str(path))
+    else:
+        profiler.stop()
+        path = out_dir / f"{name}.html"
+        path.write_text(profiler.output_html())
+    return str(path)
+
+
+# -----------------------------
+# Reporting & comparison
+# -----------------------------
+def _fmt(value, unit: str, spec: str = ".1f") -> str:
+    return "n/a" if value is None else f"{value:{spec}}{unit}"
+
+
+def format_stage(m: StageMetrics) -> str:
+    rows = ""
+    if m.rows_in is not None or m.rows_out is not None:
+        rows = f"  rows {_fmt(m.rows_in, '', ',')} → {_fmt(m.rows_out, '', ',')}"
+    status = "❌" if m.error else "⏱️ "
+    return (f"{status} {m.name}: wall {m.wall_s:.2f}s  cpu {m.cpu_s:.2f}s  "
+            f"peak RSS {_fmt(m.peak_rss_mb, ' MB')}{rows}")
+
+
+def load_report(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_reports(old: dict, new: dict, tolerance: float = 0.2) -> List[Dict]:
+    """
+    Compare two run reports stage by stage.
+
+    A metric regresses when it grew by more than `tolerance` (relative) and by
+    more than the floor in `COMPARED_METRICS` (absolute).
+
+    Returns:
+        One dict per regression: stage, metric, old, new, change (relative)
+    """
+    old_stages = {s["name"]: s for s in old["stages"]}
+    regressions = []
+    for stage in new["stages"]:
+        base = old_stages.get(stage["name"])
+        if base is None:
+            continue
+        for metric, floor in COMPARED_METRICS.items():
+            before, after = base.get(metric), stage.get(metric)
+            if before is None or after is None:
+                continue
+            if after - before > floor and after > before * (1 + tolerance):
+                regressions.append({
+                    "stage": stage["name"],
+                    "metric": metric,
+                    "old": before,
+                    "new": after,
+                    "change": (after - before) / before if before else float("inf"),
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and compare pipeline run reports.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="print a run report")
+    show.add_argument("report")
+    cmp_ = sub.add_parser("compare", help="flag regressions between two run reports")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--tolerance", type=float, default=0.2, help="allowed relative growth (default 0.2)")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        report = load_report(args.report)
+        print(f"Run: {report['run']} ({report['started_at']}, {report['host']})")
+        for stage in report["stages"]:
+            print("  " + format_stage(StageMetrics(**stage)))
+        print(f"Total wall time: {report['total_wall_s']:.2f}s")
+        return
+
+    regressions = compare_reports(load_report(args.old), load_report(args.new), args.tolerance)
+    if not regressions:
+        print("✅ No regressions")
+        return
+    print(f"❌ {len(regressions)} regression(s):")
+    for r in regressions:
+        print(f"  {r['stage']:<24} {r['metric']:<12} {r['old']:.2f} → {r['new']:.2f} ({r['change']:+.0%})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Pipeline Runner for the Notebook Stages
+=======================================
+
+Runs the notebooks from documents/PIPELINE.md as declared stages with explicit
+inputs and outputs, instead of by hand in order.
+
+- A stage is skipped when the content hashes of its notebook and input files
+  match the last successful run and all of its outputs still exist.
+- Stages whose inputs do not depend on each other run concurrently
+  (e.g. crash cleaning `01` and weather `03`).
+- A failed stage stops everything downstream of it, other branches keep going.
+
+Notebooks are executed with `jupyter nbconvert --execute` from the notebooks/
+directory, so their hard-coded `../data/...` paths keep working. Executed copies
+are written to data/.pipeline/executed/ and the notebooks themselves are not
+modified.
+
+Stages that download their raw data (01, 03, 04.5) only see local inputs, so
+use `--force` to pull fresh data from the APIs.
+
+Usage:
+    python src/pipeline.py                 # refresh everything that changed
+    python src/pipeline.py cate            # refresh `cate` and its upstream stages
+    python src/pipeline.py --dry-run       # show what would run
+    python src/pipeline.py --force weather # rerun a stage regardless of cache
+    python src/pipeline.py --force weather -- cate  # force `weather`, refresh up to `cate`
+
+`--force` takes one or more stage names, so put `--` before the target stages.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Configuration
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT / "data" / ".pipeline"
+CACHE_PATH = CACHE_DIR / "cache.json"
+HASH_CHUNK = 1 << 20  # 1 MiB
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    notebook: str
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+
+
+# Paths are relative to the repository root
+STAGES = [
+    Stage(
+        name="crash_cleaning",
+        notebook="notebooks/01_data_cleaning.ipynb",
+        outputs=["data/nyc_crash_data.csv", "data/crashes_cleaned.csv"],
+    ),
+    Stage(
+        name="weather",
+        notebook="notebooks/03_weather.ipynb",
+        outputs=["data/nyc_weather_hourly.csv"],
+    ),
+    Stage(
+        name="h3_panel",
+        notebook="notebooks/02_a_h3_construction.ipynb",
+        inputs=["data/crashes_cleaned.csv"],
+        outputs=["data/h3_panel_res8.csv"],
+    ),
+    Stage(
+        name="h3_full_panel",
+        notebook="notebooks/02_b_h3_full_construction.ipynb",
+        inputs=["data/h3_panel_res8.csv", "data/nyc_weather_hourly.csv"],
+        outputs=["data/h3_full_panel_res8.csv"],
+    ),
+    # The TLC query itself is independent, but the coverage and alignment
+    # checks at the end of 04.5 read the full panel and the weather file.
+    Stage(
+        name="tlc_traffic",
+        notebook="notebooks/04.5_TLC_data_cleaning.ipynb",
+        inputs=["data/taxi_zones/taxi_zones.shp", "data/h3_full_panel_res8.csv", "data/nyc_weather_hourly.csv"],
+        outputs=["data/zone_h3_lookup_polyfill.parquet", "data/traffic_h3_2022_2025_polyfill.parquet"],
+    ),
+    Stage(
+        name="causal_ate",
+        notebook="notebooks/04_causal.ipynb",
+        inputs=["data/h3_full_panel_res8.csv", "data/nyc_weather_hourly.csv"],
+        outputs=["data/analysis_ready.csv", "data/analysis_ready_clean.csv"],
+    ),
+    Stage(
+        name="causal_validation",
+        notebook="notebooks/05_causal_validation.ipynb",
+        inputs=["data/h3_full_panel_res8.csv", "data/traffic_h3_2022_2025_polyfill.parquet"],
+    ),
+    Stage(
+        name="cate",
+        notebook="notebooks/06_CATE.ipynb",
+        inputs=[
+            "data/analysis_ready_clean.csv",
+            "data/h3_full_panel_res8.csv",
+            "data/traffic_h3_2022_2025_polyfill.parquet",
+        ],
+        outputs=["data/cate_by_h3_cells.csv", "data/cate_sample_with_predictions.csv"],
+    ),
+]
+
+
+# -----------------------------
+# Hashing
+# -----------------------------
+class HashCache:
+    """
+    Content hashes of files, memoized by (size, mtime) so that unchanged
+    multi-GB inputs are not re-read on every run.
+    """
+
+    def __init__(self, fingerprints: Optional[Dict[str, list]] = None):
+        self.fingerprints = fingerprints or {}
+
+    def file_hash(self, path: Path) -> Optional[str]:
+        if not path.exists():
+            return None
+        st = path.stat()
+        key = str(path)
+        cached = self.fingerprints.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.fingerprints[key] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+def execute_notebook(stage: Stage, root: Path) -> None:
+    """Execute a notebook with nbconvert, keeping the source notebook untouched."""
+    out_dir = root / "data" / ".pipeline" / "executed"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    nb_path = root / stage.notebook
+    subprocess.run(
+        [
+            "jupyter", "nbconvert",
+            "--to", "notebook",
+            "--execute", nb_path.name,
+            "--output", nb_path.stem,
+            "--output-dir", str(out_dir),
+            "--ExecutePreprocessor.timeout=-1",
+        ],
+        cwd=nb_path.parent,
+        check=True,
+    )
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: Sequence[Stage] = STAGES,
+        root: Path = ROOT,
+        cache_path: Path = CACHE_PATH,
+        execute: Callable[[Stage, Path], None] = execute_notebook,
+    ):
+        self.stages = {s.name: s for s in stages}
+        self.root = Path(root)
+        self.cache_path = Path(cache_path)
+        self.execute = execute
+
+        producers = {out: s.name for s in stages for out in s.outputs}
+        self.upstream: Dict[str, set] = {
+            s.name: {producers[i] for i in s.inputs if i in producers} for s in stages
+        }
+
+        state = self._load_cache()
+        self.hashes = HashCache(state.get("files"))
+        self.stage_keys: Dict[str, str] = state.get("stages", {})
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"stages": self.stage_keys, "files": self.hashes.fingerprints}, f, indent=2)
+        os.replace(tmp, self.cache_path)
+
+    def stage_key(self, stage: Stage) -> Optional[str]:
+        """Hash of the notebook and all inputs, or None if an input is missing."""
+        h = hashlib.sha256()
+        for rel in [stage.notebook, *stage.inputs]:
+            digest = self.hashes.file_hash(self.root / rel)
+            if digest is None:
+                return None
+            h.update(f"{rel}:{digest}\n".encode())
+        return h.hexdigest()
+
+    def is_fresh(self, stage: Stage) -> bool:
+        key = self.stage_key(stage)
+        return (
+            key is not None
+            and self.stage_keys.get(stage.name) == key
+            and all((self.root / out).exists() for out in stage.outputs)
+        )
+
+    def resolve(self, targets: Optional[Sequence[str]] = None) -> List[str]:
+        """Selected stages plus everything upstream of them, in declaration order."""
+        if not targets:
+            return list(self.stages)
+        unknown = [t for t in targets if t not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {unknown}. Available: {list(self.stages)}")
+        needed, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.upstream[name])
+        return [name for name in self.stages if name in needed]
+
+    def run(
+        self,
+        targets: Optional[Sequence[str]] = None,
+        force: Sequence[str] = (),
+        jobs: int = 3,
+        dry_run: bool = False,
+    ) -> Dict[str, str]:
+        """
+        Run the selected stages, concurrently where the graph allows.
+
+        Returns a status per stage: "ran", "skipped", "failed" or "blocked"
+        (or "would run" / "skipped" with `dry_run`).
+        """
+        selected = self.resolve(targets)
+        unknown = [f for f in force if f != "all" and f not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {unknown}. Available: {list(self.stages)}")
+        force_all = "all" in force
+        status: Dict[str, str] = {}
+
+        if dry_run:
+            for name in selected:
+                stage = self.stages[name]
+                stale = force_all or name in force or not self.is_fresh(stage)
+                # Anything downstream of a stage that would run is stale too
+                stale = stale or any(status.get(up) == "would run" for up in self.upstream[name])
+                status[name] = "would run" if stale else "skipped"
+            return status
+
+        pending = list(selected)
+        running, keys = {}, {}
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while pending or running:
+                for name in list(pending):
+                    ups = self.upstream[name] & set(selected)
+                    if any(status.get(up) in ("failed", "blocked") for up in ups):
+                        status[name] = "blocked"
+                        pending.remove(name)
+                        print(f"⛔ {name}: blocked by failed upstream stage")
+                    elif all(up in status for up in ups):
+                        pending.remove(name)
+                        stage = self.stages[name]
+                        if not (force_all or name in force) and self.is_fresh(stage):
+                            status[name] = "skipped"
+                            print(f"⏭️  {name}: unchanged, skipped")
+                        else:
+                            # Hash on this thread; workers only execute notebooks
+                            keys[name] = self.stage_key(stage)
+                            print(f"▶️  {name}: running {stage.notebook}")
+                            running[pool.submit(self._run_stage, stage)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        elapsed = future.result()
+                    except Exception as e:
+                        status[name] = "failed"
+                        print(f"❌ {name}: failed ({e})")
+                    else:
+                        status[name] = "ran"
+                        if keys[name] is not None:
+                            self.stage_keys[name] = keys[name]
+                        print(f"✓ {name}: done in {elapsed:.1f}s")
+                    self._save_cache()
+        return status
+
+    def _run_stage(self, stage: Stage) -> float:
+        start = time.perf_counter()
+        self.execute(stage, self.root)
+        missing = [out for out in stage.outputs if not (self.root / out).exists()]
+        if missing:
+            raise RuntimeError(f"outputs not written: {missing}")
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the notebook pipeline with stage caching.")
+    parser.add_argument("stages", nargs="*", help="stages to refresh (default: all); upstream stages are included")
+    parser.add_argument(
+        "--force", nargs="+", action="extend", default=[], metavar="STAGE",
+        help="rerun these stages regardless of cache ('all' for every stage); end the list with -- before target stages",
+    )
+    parser.add_argument("--jobs", type=int, default=3, help="max stages running at once")
+    parser.add_argument("--dry-run", action="store_true", help="show which stages would run")
+    parser.add_argument("--list", action="store_true", help="list stages and their dependencies")
+    args = parser.parse_args()
+
+    pipeline = Pipeline()
+    if args.list:
+        for name, stage in pipeline.stages.items():
+            ups = ", ".join(sorted(pipeline.upstream[name])) or "-"
+            print(f"{name:<18} {stage.notebook:<45} after: {ups}")
+        return
+
+    try:
+        status = pipeline.run(args.stages, force=args.force, jobs=args.jobs, dry_run=args.dry_run)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    print("=" * 60)
+    for name, result in status.items():
+        print(f"  {name:<18} {result}")
+    print("=" * 60)
+    if any(result in ("failed", "blocked") for result in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Streaming Rain-Risk Scorer for H3 Cells
+=======================================
+
+Live counterpart of the batch pipeline. Instead of recomputing `Baseline_Risk`
+over all history (02_b) and reading CATE from a static CSV (06), this script
+consumes hourly weather, traffic and crash events from a pluggable source and
+keeps per-cell rolling state in fixed-size ring buffers.
+
+Each hour it emits per-cell rain-risk scores, and as soon as the weather event
+for an hour reports rain it emits alerts for the most exposed cells.
+
+Events are JSON objects, one per line:
+    {"type": "weather", "datetime": "2025-10-01T14:00", "precipitation": 0.4}
+    {"type": "traffic", "datetime": "2025-10-01T14:00", "h3_index": "882a...", "traffic_count": 12.5}
+    {"type": "crash",   "datetime": "2025-10-01T14:23", "latitude": 40.71, "longitude": -74.0}
+
+Crash events may carry `h3_index` directly instead of lat/lon. Datetimes are
+naive local (New York) time, like the batch data; timestamps with an offset or
+`Z` are converted to local time.
+
+Usage:
+    python stream_risk.py --file ../data/live_events.jsonl
+    python stream_risk.py --socket localhost:9999
+
+Memory is bounded by (n_cells x baseline_window); per-event work is O(1) and
+per-hour work is O(n_cells).
+"""
+
+import argparse
+import json
+import math
+import socket
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import h3
+import numpy as np
+import pandas as pd
+
+# Configuration
+CATE_PATH = "../data/cate_by_h3_cells.csv"
+H3_RESOLUTION = 8
+BASELINE_WINDOW = 30   # hours, same window as 02_b (lag of 1 hour is implicit)
+RAIN_THRESHOLD = 0.1   # mm, same threshold as 03_weather
+TOP_N = 30             # how many cells to alert on while it rains
+TIMEZONE = "America/New_York"  # local time of the crash/weather data
+
+
+@dataclass
+class StreamConfig:
+    h3_res: int = H3_RESOLUTION
+    baseline_window: int = BASELINE_WINDOW
+    rain_threshold: float = RAIN_THRESHOLD
+    top_n: int = TOP_N
+    timezone: str = TIMEZONE
+
+
+@dataclass
+class HourlyScores:
+    """Scores for every tracked cell for one hour, plus the alerted subset."""
+    hour: pd.Timestamp
+    rain_flag: int
+    precipitation: float
+    scores: pd.DataFrame
+    alerts: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
+class CellRingBuffer:
+    """
+    Fixed-size history of hourly crash counts for every cell.
+
+    Column `pos` holds the oldest hour and is overwritten by the next push, so
+    the running sum can be updated in O(n_cells) without rescanning history.
+    """
+
+    def __init__(self, n_cells: int, window: int):
+        self.window = window
+        self.counts = np.zeros((n_cells, window), dtype=np.int64)
+        self.sums = np.zeros(n_cells, dtype=np.int64)
+        self.pos = 0
+        self.filled = 0
+
+    def push(self, hour_counts: np.ndarray) -> None:
+        """Append one completed hour of counts, evicting the oldest hour."""
+        self.sums += hour_counts - self.counts[:, self.pos]
+        self.counts[:, self.pos] = hour_counts
+        self.pos = (self.pos + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+
+    def push_zeros(self, n_hours: int) -> None:
+        """Append `n_hours` of empty hours (no crash events seen)."""
+        if n_hours >= self.window:
+            self.counts[:] = 0
+            self.sums[:] = 0
+            self.pos = 0
+            self.filled = self.window
+            return
+        zeros = np.zeros(len(self.sums), dtype=np.int64)
+        for _ in range(n_hours):
+            self.push(zeros)
+
+    def mean(self) -> np.ndarray:
+        """Rolling mean over the filled part of the window (0 before any hour)."""
+        if self.filled == 0:
+            return np.zeros(len(self.sums), dtype=float)
+        return self.sums / self.filled
+
+
+class StreamingRiskScorer:
+    """
+    Incremental per-cell rain-risk scorer.
+
+    The cell universe is fixed at construction (the cells of the CATE table),
+    which keeps memory bounded; events for unknown cells are counted and dropped.
+
+    Score for cell c at hour h:
+        risk = Baseline_Risk(c, h) + rain_flag(h) * cate_mean(c)
+    where Baseline_Risk is the mean crash count over the previous
+    `baseline_window` hours, matching the lagged rolling mean from 02_b.
+    """
+
+    def __init__(self, cate_by_cell: pd.DataFrame, config: Optional[StreamConfig] = None):
+        self.cfg = config or StreamConfig()
+        cells = cate_by_cell.dropna(subset=["h3_index", "cate_mean"])
+        self.cells = cells["h3_index"].to_numpy()
+        self.cate = cells["cate_mean"].to_numpy(dtype=float)
+        self.cell_pos: Dict[str, int] = {c: i for i, c in enumerate(self.cells)}
+
+        n_cells = len(self.cells)
+        self.history = CellRingBuffer(n_cells, self.cfg.baseline_window)
+        self.current_counts = np.zeros(n_cells, dtype=np.int64)
+        self.traffic = np.full(n_cells, np.nan)
+
+        self.current_hour: Optional[pd.Timestamp] = None
+        self.precipitation = 0.0
+        self.rain_flag = 0
+        self.emitted_rain_flag: Optional[int] = None
+        self.stats = {"events": 0, "late": 0, "unknown_cell": 0, "bad_event": 0}
+
+    @classmethod
+    def from_csv(cls, path: str = CATE_PATH, config: Optional[StreamConfig] = None) -> "StreamingRiskScorer":
+        return cls(pd.read_csv(path), config)
+
+    # -----------------------------
+    # Event handling
+    # -----------------------------
+    def process(self, event: dict) -> List[HourlyScores]:
+        """
+        Consume one event and return any scores it caused to be emitted.
+
+        Scores for an hour are emitted when its weather event arrives, again if
+        a later weather event in the same hour starts the rain, and at the close
+        of the hour if no weather was seen (carrying the last known weather).
+        """
+        self.stats["events"] += 1
+        try:
+            ts = pd.Timestamp(event["datetime"])
+            kind = event["type"]
+        except (KeyError, ValueError, TypeError):
+            self.stats["bad_event"] += 1
+            return []
+        if pd.isna(ts):  # null / empty datetime parses to NaT
+            self.stats["bad_event"] += 1
+            return []
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert(self.cfg.timezone).tz_localize(None)
+        hour = ts.floor("h")
+
+        emitted = self._advance_to(hour)
+        if hour < self.current_hour:
+            self.stats["late"] += 1
+            return emitted
+
+        if kind == "weather":
+            try:
+                precipitation = _finite(event.get("precipitation"))
+            except (ValueError, TypeError):
+                self.stats["bad_event"] += 1
+                return emitted
+            self.precipitation = precipitation
+            self.rain_flag = int(self.precipitation > self.cfg.rain_threshold)
+            if self.emitted_rain_flag is None or self.rain_flag > self.emitted_rain_flag:
+                emitted.append(self._emit())
+        elif kind == "crash":
+            idx = self._cell_index(event)
+            if idx is not None:
+                self.current_counts[idx] += 1
+        elif kind == "traffic":
+            idx = self._cell_index(event)
+            if idx is not None:
+                try:
+                    self.traffic[idx] = _finite(event.get("traffic_count"))
+                except (ValueError, TypeError):
+                    self.stats["bad_event"] += 1
+        else:
+            self.stats["bad_event"] += 1
+        return emitted
+
+    def flush(self) -> List[HourlyScores]:
+        """Close the current hour (end of stream)."""
+        if self.current_hour is None:
+            return []
+        emitted = self._close_hour()
+        self.current_hour = None
+        return emitted
+
+    def _cell_index(self, event: dict) -> Optional[int]:
+        cell = event.get("h3_index")
+        if cell is None:
+            try:
+                cell = h3.latlng_to_cell(float(event["latitude"]), float(event["longitude"]), self.cfg.h3_res)
+            except (KeyError, ValueError, TypeError):
+                self.stats["bad_event"] += 1
+                return None
+        idx = self.cell_pos.get(cell)
+        if idx is None:
+            self.stats["unknown_cell"] += 1
+        return idx
+
+    def _advance_to(self, hour: pd.Timestamp) -> List[HourlyScores]:
+        if self.current_hour is None:
+            self.current_hour = hour
+            return []
+        if hour <= self.current_hour:
+            return []
+        gap = int((hour - self.current_hour) / pd.Timedelta(hours=1))
+        emitted = self._close_hour()
+        # Hours with no events at all are zero-crash hours, as in the full panel
+        self.history.push_zeros(gap - 1)
+        self.current_hour = hour
+        return emitted
+
+    def _close_hour(self) -> List[HourlyScores]:
+        emitted = [] if self.emitted_rain_flag is not None else [self._emit()]
+        self.history.push(self.current_counts)
+        self.current_counts[:] = 0
+        # Traffic counts are per hour; cells with no report in the next hour are unknown
+        self.traffic[:] = np.nan
+        self.emitted_rain_flag = None
+        return emitted
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    def _emit(self) -> HourlyScores:
+        baseline = self.history.mean()
+        risk = baseline + self.rain_flag * self.cate
+        scores = pd.DataFrame({
+            "h3_index": self.cells,
+            "baseline_risk": baseline,
+            "cate_mean": self.cate,
+            "traffic_count": self.traffic,
+            "risk_score": risk,
+        })
+
+        alerts = scores.iloc[0:0]
+        if self.rain_flag and len(scores) > 0:
+            k = min(self.cfg.top_n, len(risk))
+            top = np.argpartition(-risk, k - 1)[:k]
+            alerts = scores.iloc[top].sort_values("risk_score", ascending=False)
+
+        self.emitted_rain_flag = self.rain_flag
+        return HourlyScores(
+            hour=self.current_hour,
+            rain_flag=self.rain_flag,
+            precipitation=self.precipitation,
+            scores=scores,
+            alerts=alerts,
+        )
+
+
+def _finite(value) -> float:
+    """Numeric event field (missing = 0); NaN and inf raise ValueError like non-numeric input."""
+    x = float(value or 0.0)
+    if not math.isfinite(x):
+        raise ValueError(f"non-finite value: {value!r}")
+    return x
+
+
+# -----------------------------
+# Event sources
+# -----------------------------
+def _parse_line(line: str, stats: Optional[dict]) -> Optional[dict]:
+    """Decode one JSON line; malformed lines are counted in `stats["bad_event"]` and skipped."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        if stats is not None:
+            stats["bad_event"] += 1
+        return None
+
+
+def tail_file(
+    path: str,
+    follow: bool = True,
+    poll_interval: float = 1.0,
+    stats: Optional[dict] = None,
+) -> Iterator[dict]:
+    """
+    Yield JSON events from a file, one per line.
+
+    With `follow=True` keeps waiting for new lines like `tail -f`. A line the
+    writer has not finished yet (no trailing newline) is held back until the
+    rest of it arrives.
+    """
+    buf = ""
+    with open(path, "r") as f:
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            buf += chunk
+            if not buf.endswith("\n"):
+                continue
+            event = _parse_line(buf, stats)
+            buf = ""
+            if event is not None:
+                yield event
+    # End of a finished file: the last line may lack a newline
+    event = _parse_line(buf, stats)
+    if event is not None:
+        yield event
+
+
+def read_socket(host: str, port: int, stats: Optional[dict] = None) -> Iterator[dict]:
+    """Yield JSON events from a newline-delimited TCP stream."""
+    with socket.create_connection((host, port)) as conn:
+        with conn.makefile("r") as f:
+            for line in f:
+                event = _parse_line(line, stats)
+                if event is not None:
+                    yield event
+
+
+def run(
+    source: Iterable[dict],
+    scorer: StreamingRiskScorer,
+    on_scores: Callable[[HourlyScores], None],
+) -> None:
+    """Feed every event from `source` to `scorer`, calling `on_scores` on each emission."""
+    for event in source:
+        for result in scorer.process(event):
+            on_scores(result)
+    for result in scorer.flush():
+        on_scores(result)
+
+
+def print_alerts(result: HourlyScores) -> None:
+    if not result.rain_flag:
+        print(f"{result.hour}  dry  ({len(result.scores)} cells scored)")
+        return
+    print(f"{result.hour}  🌧️  rain {result.precipitation:.2f} mm – {len(result.alerts)} alerts")
+    for _, row in result.alerts.head(10).iterrows():
+        print(f"    {row['h3_index']}  risk={row['risk_score']:.4f}  "
+              f"(baseline {row['baseline_risk']:.4f} + CATE {row['cate_mean']:.4f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream hourly rain-risk scores per H3 cell.")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--file", help="JSON-lines event file to tail")
+    src.add_argument("--socket", help="host:port of a newline-delimited JSON event stream")
+    parser.add_argument("--no-follow", action="store_true", help="stop at end of file instead of tailing")
+    parser.add_argument("--cate-path", default=CATE_PATH)
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    args = parser.parse_args()
+
+    try:
+        scorer = StreamingRiskScorer.from_csv(args.cate_path, StreamConfig(top_n=args.top_n))
+    except FileNotFoundError:
+        print(f"❌ Error: CATE table not found at {args.cate_path}")
+        sys.exit(1)
+    print(f"✓ Tracking {len(scorer.cells):,} H3 cells (window={scorer.cfg.baseline_window}h)")
+
+    if args.file:
+        source = tail_file(args.file, follow=not args.no_follow, stats=scorer.stats)
+    else:
+        host, port = args.socket.rsplit(":", 1)
+        source = read_socket(host, int(port), stats=scorer.stats)
+
+    try:
+        run(source, scorer, print_alerts)
+    except KeyboardInterrupt:
+        pass
+    print(f"Stream stats: {scorer.stats}")
+
+
+if __name__ == "__main__":
+    main()
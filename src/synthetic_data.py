@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator for Benchmarks
+=======================================
+
+Seeded, fully offline stand-ins for the pipeline datasets, shaped like the real
+files so the notebook code paths can be timed at any scale:
+
+    crashes   ~ crashes_cleaned.csv            (one row per crash)
+    weather   ~ nyc_weather_hourly.csv         (date, hour, precipitation, visibility, rain_flag)
+    traffic   ~ traffic_h3_2022_2025_polyfill  (h3_index, match_hour, traffic_count)
+    dense     ~ h3_panel_res8.csv              (cell-hours with >= 1 crash)
+    panel     ~ h3_full_panel_res8.csv + traffic_count (every cell-hour, analysis-ready)
+
+Sparsity matches the real data: ~0.8% of cell-hours have a crash and ~11% of
+hours have rain (rain comes in multi-hour episodes, not independent hours).
+
+Usage:
+    python synthetic_data.py --scale 1M --out ../data/synthetic
+"""
+
+import argparse
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import List, Optional
+
+import h3
+import numpy as np
+import pandas as pd
+
+# Configuration
+NYC_CENTER = (40.7128, -74.0060)
+H3_RESOLUTION = 8
+RAIN_THRESHOLD = 0.1              # mm, same as 03_weather
+RUSH_HOURS = [7, 8, 9, 16, 17, 18]  # weekday rush hours, same as 02_b
+BASELINE_WINDOW = 30
+
+# Named scales: (n_cells, n_hours); rows = n_cells * n_hours
+SCALES = {
+    "10K": (100, 100),
+    "1M": (1_000, 1_000),
+    "10M": (2_500, 4_000),
+    "100M": (5_000, 20_000),
+}
+
+
+@dataclass
+class SyntheticConfig:
+    n_cells: int = 1_000
+    n_hours: int = 1_000
+    crash_rate: float = 0.008        # share of cell-hours with >= 1 crash
+    rain_rate: float = 0.11          # share of hours with rain_flag = 1
+    rain_episode_hours: float = 4.0  # mean length of a rain episode
+    rain_uplift: float = 0.12        # relative crash increase while raining
+    traffic_coverage: float = 0.7    # share of cells with any TLC pickups
+    seed: int = 42
+    start: str = "2022-01-01"
+
+    @property
+    def n_rows(self) -> int:
+        return self.n_cells * self.n_hours
+
+
+def config_for_scale(scale: str, **overrides) -> SyntheticConfig:
+    """Config for a named scale ('1M', '10M', '100M', ...)."""
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale {scale!r}. Available: {list(SCALES)}")
+    n_cells, n_hours = SCALES[scale]
+    return replace(SyntheticConfig(n_cells=n_cells, n_hours=n_hours), **overrides)
+
+
+# -----------------------------
+# Building blocks
+# -----------------------------
+def make_cells(n_cells: int, res: int = H3_RESOLUTION) -> List[str]:
+    """`n_cells` contiguous H3 cells spiralling out from the NYC center."""
+    center = h3.latlng_to_cell(*NYC_CENTER, res)
+    k = 0
+    while 3 * k * (k + 1) + 1 < n_cells:
+        k += 1
+    rings = [center]
+    for ring in range(1, k + 1):
+        rings.extend(sorted(h3.grid_ring(center, ring)))
+    return rings[:n_cells]
+
+
+def _hours(cfg: SyntheticConfig) -> pd.DatetimeIndex:
+    return pd.date_range(cfg.start, periods=cfg.n_hours, freq="h")
+
+
+def _hour_multiplier(times: pd.DatetimeIndex, rain_flag: np.ndarray, cfg: SyntheticConfig) -> np.ndarray:
+    """Relative crash intensity per hour (diurnal, rush hour, rain), mean 1."""
+    hour = times.hour.to_numpy()
+    weekday = times.dayofweek.to_numpy() < 5
+    diurnal = 0.4 + 0.6 * np.sin(np.pi * np.clip(hour - 5, 0, 19) / 19)
+    rush = np.where(weekday & np.isin(hour, RUSH_HOURS), 1.3, 1.0)
+    mult = diurnal * rush * (1 + cfg.rain_uplift * rain_flag)
+    return mult / mult.mean()
+
+
+def make_weather(cfg: SyntheticConfig) -> pd.DataFrame:
+    """
+    Hourly weather with rain in episodes (two-state Markov chain whose
+    stationary rain share is `rain_rate`).
+    """
+    rng = np.random.default_rng([cfg.seed, 1])
+    p_stop = 1.0 / cfg.rain_episode_hours
+    p_start = cfg.rain_rate * p_stop / (1 - cfg.rain_rate)
+
+    u = rng.random(cfg.n_hours)
+    raining = np.empty(cfg.n_hours, dtype=bool)
+    state = rng.random() < cfg.rain_rate
+    for t in range(cfg.n_hours):
+        state = (u[t] >= p_stop) if state else (u[t] < p_start)
+        raining[t] = state
+
+    precipitation = np.where(
+        raining,
+        RAIN_THRESHOLD + 0.05 + rng.exponential(1.0, cfg.n_hours),
+        np.where(rng.random(cfg.n_hours) < 0.05, rng.uniform(0, RAIN_THRESHOLD, cfg.n_hours), 0.0),
+    ).round(1)
+    visibility = np.where(raining, rng.uniform(2_000, 15_000, cfg.n_hours), 24_140.0)
+
+    times = _hours(cfg)
+    weather = pd.DataFrame({
+        "date": times.date,
+        "hour": times.hour,
+        "precipitation": precipitation,
+        "visibility": visibility,
+    })
+    weather["rain_flag"] = (weather["precipitation"] > RAIN_THRESHOLD).astype(int)
+    return weather
+
+
+def make_crashes(cfg: SyntheticConfig, cells: List[str], weather: pd.DataFrame) -> pd.DataFrame:
+    """
+    Crash-level records. Hourly totals are Poisson and spread over cells with
+    skewed per-cell weights, so hot spots exist and the work stays O(n_crashes).
+    """
+    rng = np.random.default_rng([cfg.seed, 2])
+    # P(count >= 1) = crash_rate for a Poisson cell-hour
+    base = -np.log1p(-cfg.crash_rate)
+    cell_weight = rng.gamma(0.6, 1.0, cfg.n_cells)
+    cell_weight /= cell_weight.sum()
+
+    times = _hours(cfg)
+    mult = _hour_multiplier(times, weather["rain_flag"].to_numpy(), cfg)
+    per_hour = rng.poisson(base * cfg.n_cells * mult)
+    hour_idx = np.repeat(np.arange(cfg.n_hours), per_hour)
+    cell_idx = rng.choice(cfg.n_cells, size=len(hour_idx), p=cell_weight)
+
+    centroids = np.array([h3.cell_to_latlng(c) for c in cells])
+    jitter = rng.normal(0, 0.001, size=(len(cell_idx), 2))
+    minutes = rng.integers(0, 60, len(cell_idx))
+
+    crashes = pd.DataFrame({
+        "collision_id": np.arange(len(cell_idx)) + 4_000_000,
+        "crash_datetime": times[hour_idx] + pd.to_timedelta(minutes, unit="m"),
+        "latitude": centroids[cell_idx, 0] + jitter[:, 0],
+        "longitude": centroids[cell_idx, 1] + jitter[:, 1],
+        "h3": np.asarray(cells, dtype=object)[cell_idx],
+        "number_of_persons_injured": rng.poisson(0.5, len(cell_idx)),
+        "number_of_persons_killed": (rng.random(len(cell_idx)) < 0.002).astype(int),
+    })
+    return crashes.sort_values("crash_datetime", ignore_index=True)
+
+
+def make_traffic(cfg: SyntheticConfig, cells: List[str]) -> pd.DataFrame:
+    """Sparse hourly TLC pickups per cell, only for a subset of (mostly central) cells."""
+    rng = np.random.default_rng([cfg.seed, 3])
+    n_covered = int(cfg.traffic_coverage * cfg.n_cells)
+    covered = np.arange(n_covered)  # cells are ordered outwards from the center
+    level = rng.lognormal(1.0, 1.2, n_covered)
+
+    times = _hours(cfg)
+    hour = times.hour.to_numpy()
+    diurnal = 0.15 + np.sin(np.pi * np.clip(hour - 4, 0, 20) / 20)
+
+    # Blocks of cells keep the temporary (cells x hours) arrays small at 100M scale
+    block = max(1, 2_000_000 // cfg.n_hours)
+    cell_ids, hour_ids, values = [], [], []
+    for lo in range(0, n_covered, block):
+        expected = level[lo:lo + block, None] * diurnal[None, :]
+        present = rng.random(expected.shape) < np.minimum(1.0, 0.3 + expected)
+        ci, hi = np.nonzero(present)
+        cell_ids.append(covered[lo + ci])
+        hour_ids.append(hi)
+        values.append((expected[ci, hi] * rng.gamma(2.0, 0.5, len(ci))).astype(np.float32))
+
+    cell_ids = np.concatenate(cell_ids) if cell_ids else np.array([], dtype=int)
+    hour_ids = np.concatenate(hour_ids) if hour_ids else np.array([], dtype=int)
+    return pd.DataFrame({
+        "h3_index": np.asarray(cells, dtype=object)[cell_ids],
+        # 04.5 shifts pickups by one hour to align with crash hours
+        "match_hour": times[hour_ids] + pd.Timedelta(hours=1),
+        "traffic_count": np.concatenate(values) if values else np.array([], dtype=np.float32),
+    })
+
+
+def make_dense_panel(crashes: pd.DataFrame) -> pd.DataFrame:
+    """(h3, date, hour) rows with >= 1 crash, as written by 02_a."""
+    df = crashes.assign(
+        date=crashes["crash_datetime"].dt.date,
+        hour=crashes["crash_datetime"].dt.hour,
+    )
+    return df.groupby(["h3", "date", "hour"]).agg(
+        accidents_count=("collision_id", "count"),
+        total_injured=("number_of_persons_injured", "sum"),
+        total_killed=("number_of_persons_killed", "sum"),
+    ).reset_index()
+
+
+# -----------------------------
+# Full panel
+# -----------------------------
+def make_panel(cfg: SyntheticConfig, data: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Analysis-ready full panel (every cell-hour), built directly with numpy in
+    compact dtypes so 100M rows stay within a few GB. Rows are sorted by
+    (h3_index, datetime) like 02_b.
+    """
+    data = data or generate(cfg, include_panel=False)
+    cells, weather, crashes, traffic = data["cells"], data["weather"], data["crashes"], data["traffic"]
+    times = _hours(cfg)
+    cell_pos = pd.Index(cells)
+
+    counts = np.zeros((cfg.n_cells, cfg.n_hours), dtype=np.int16)
+    hour_idx = ((crashes["crash_datetime"] - times[0]) // pd.Timedelta(hours=1)).to_numpy()
+    np.add.at(counts, (cell_pos.get_indexer(crashes["h3"]), hour_idx), 1)
+
+    traffic_grid = np.zeros((cfg.n_cells, cfg.n_hours), dtype=np.float32)
+    t_idx = ((traffic["match_hour"] - times[0]) // pd.Timedelta(hours=1)).to_numpy()
+    keep = t_idx < cfg.n_hours
+    traffic_grid[cell_pos.get_indexer(traffic["h3_index"][keep]), t_idx[keep]] = traffic["traffic_count"][keep]
+
+    # Lagged rolling mean over the previous BASELINE_WINDOW hours (02_b), 0 for the first hour
+    csum = np.zeros((cfg.n_cells, cfg.n_hours + 1), dtype=np.int32)
+    np.cumsum(counts, axis=1, out=csum[:, 1:])
+    t = np.arange(cfg.n_hours)
+    lo = np.maximum(t - BASELINE_WINDOW, 0)
+    n_prev = np.maximum(t - lo, 1)
+    baseline = ((csum[:, t] - csum[:, lo]) / n_prev).astype(np.float32)
+
+    hour = times.hour.to_numpy()
+    dow = times.dayofweek.to_numpy()
+    is_weekend = (dow >= 5).astype(np.int8)
+    is_rush = (np.isin(hour, RUSH_HOURS) & (is_weekend == 0)).astype(np.int8)
+
+    def per_hour(values, dtype):
+        return np.tile(np.asarray(values, dtype=dtype), cfg.n_cells)
+
+    panel = pd.DataFrame({
+        "h3_index": pd.Categorical.from_codes(np.repeat(np.arange(cfg.n_cells), cfg.n_hours), categories=cells),
+        "datetime": np.tile(times.to_numpy(), cfg.n_cells),
+        "hour": per_hour(hour, np.int8),
+        "accidents_count": counts.ravel(),
+        "day_of_week": per_hour(dow, np.int8),
+        "is_weekend": per_hour(is_weekend, np.int8),
+        "month": per_hour(times.month, np.int8),
+        "is_rush_hour": per_hour(is_rush, np.int8),
+        "Baseline_Risk": baseline.ravel(),
+        "rain_flag": per_hour(weather["rain_flag"], np.int8),
+        "precipitation": per_hour(weather["precipitation"], np.float32),
+        "traffic_count": traffic_grid.ravel(),
+    })
+    panel.insert(4, "accident_indicator", (panel["accidents_count"] > 0).astype(np.int8))
+    panel["Traffic_Proxy"] = (1 + panel["is_rush_hour"]).astype(np.int8)
+    return panel
+
+
+def make_cate_by_cell(cells: List[str], seed: int = 42) -> pd.DataFrame:
+    """Per-cell CATE table shaped like cate_by_h3_cells.csv (input to app.py)."""
+    rng = np.random.default_rng([seed, 4])
+    n = len(cells)
+    cate = rng.normal(0.001, 0.0007, n) + rng.exponential(0.0005, n) * (rng.random(n) < 0.05)
+    return pd.DataFrame({
+        "h3_index": cells,
+        "cate_mean": cate,
+        "cate_median": cate * rng.uniform(0.3, 1.0, n),
+        "cate_std": np.abs(rng.normal(0.02, 0.01, n)),
+        "avg_traffic": rng.lognormal(1.0, 1.2, n),
+        "avg_baseline_risk": rng.gamma(0.6, 0.01, n),
+        "total_crashes": rng.poisson(30, n),
+    })
+
+
+def generate(cfg: SyntheticConfig, include_panel: bool = True) -> dict:
+    """All synthetic datasets for one config, keyed by name."""
+    cells = make_cells(cfg.n_cells)
+    weather = make_weather(cfg)
+    crashes = make_crashes(cfg, cells, weather)
+    data = {
+        "cells": cells,
+        "weather": weather,
+        "crashes": crashes,
+        "traffic": make_traffic(cfg, cells),
+        "dense": make_dense_panel(crashes),
+        "cate_by_cell": make_cate_by_cell(cells, cfg.seed),
+    }
+    if include_panel:
+        data["panel"] = make_panel(cfg, data)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write seeded synthetic pipeline datasets.")
+    parser.add_argument("--scale", default="1M", choices=list(SCALES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="../data/synthetic")
+    args = parser.parse_args()
+
+    cfg = config_for_scale(args.scale, seed=args.seed)
+    out = Path(args.out) / args.scale
+    out.mkdir(parents=True, exist_ok=True)
+    print(f"Generating {cfg.n_rows:,} cell-hours ({cfg.n_cells:,} cells × {cfg.n_hours:,} hours)...")
+    data = generate(cfg)
+
+    data["crashes"].to_csv(out / "crashes_cleaned.csv", index=False)
+    data["weather"].to_csv(out / "nyc_weather_hourly.csv", index=False)
+    data["traffic"].to_parquet(out / "traffic_h3_polyfill.parquet", index=False)
+    data["dense"].to_csv(out / "h3_panel_res8.csv", index=False)
+    data["panel"].to_parquet(out / "h3_full_panel_res8.parquet", index=False)
+    data["cate_by_cell"].to_csv(out / "cate_by_h3_cells.csv", index=False)
+
+    panel = data["panel"]
+    print(f"✓ Saved synthetic datasets to {out}")
+    print(f"  Crash-hours: {panel['accident_indicator'].mean()*100:.2f}% of cell-hours")
+    print(f"  Rain hours:  {data['weather']['rain_flag'].mean()*100:.2f}% of hours")
+    print(f"  Traffic rows: {len(data['traffic']):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# %% [markdown]
+# # Validation test for stage instrumentation and run-report comparison.
+
+# %%
+import json
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from instrumentation import RunReport, compare_reports, io_counters
+
+
+# %%
+def test_stage_records_rows_and_times():
+    with tempfile.TemporaryDirectory() as tmp:
+        report = RunReport("unit", report_dir=Path(tmp), verbose=False)
+        left = pd.DataFrame({"k": range(1000), "a": 1})
+        right = pd.DataFrame({"k": range(0, 1000, 2), "b": 2})
+        with report.stage("merge", rows_in=len(left)) as s:
+            merged = left.merge(right, on="k", how="inner")
+            s.rows_out = len(merged)
+
+        m = report.stages[0]
+        assert m.name == "merge" and m.rows_in == 1000 and m.rows_out == 500
+        assert m.wall_s > 0 and m.cpu_s >= 0
+        assert m.error is None
+
+        path = report.save()
+        saved = json.loads(path.read_text())
+        assert saved["run"] == "unit"
+        assert saved["stages"][0]["rows_out"] == 500
+
+
+def test_decorator_and_errors_are_recorded():
+    report = RunReport("unit", verbose=False)
+
+    @report.instrument("rolling")
+    def rolling_mean(s):
+        return s.rolling(3, min_periods=1).mean()
+
+    rolling_mean(pd.Series(range(10)))
+    assert report.stages[0].name == "rolling"
+    assert report.stages[0].rows_in == 10 and report.stages[0].rows_out == 10
+
+    try:
+        with report.stage("fit"):
+            raise ValueError("bad input")
+    except ValueError:
+        pass
+    assert report.stages[1].error == "ValueError: bad input"
+
+
+def test_stage_records_bytes_read():
+    if io_counters() is None:
+        return  # psutil missing or no per-process I/O counters on this OS
+    size = 4 * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "blob.bin"
+        path.write_bytes(b"x" * size)
+        report = RunReport("unit", verbose=False)
+        with report.stage("read"):
+            path.read_bytes()
+
+    m = report.stages[0]
+    assert size <= m.bytes_read < 2 * size
+
+
+def test_compare_flags_only_real_regressions():
+    def make(wall, rss):
+        return {"stages": [{"name": "merge", "wall_s": wall, "cpu_s": wall, "peak_rss_mb": rss}]}
+
+    old = make(10.0, 1000.0)
+    assert compare_reports(old, make(11.0, 1040.0)) == []          # within tolerance
+    assert compare_reports(make(0.1, 10.0), make(0.3, 30.0)) == []  # below absolute floors
+    regressions = compare_reports(old, make(15.0, 2000.0))
+    assert {r["metric"] for r in regressions} == {"wall_s", "cpu_s", "peak_rss_mb"}
+
+
+# %%
+if __name__ == "__main__":
+    test_stage_records_rows_and_times()
+    test_decorator_and_errors_are_recorded()
+    test_stage_records_bytes_read()
+    test_compare_flags_only_real_regressions()
+    print("✅ ALL TESTS PASSED")
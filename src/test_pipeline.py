@@ -0,0 +1,136 @@
+# %% [markdown]
+# # Validation test for the pipeline runner (notebooks replaced by fake stages).
+
+# %%
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from pipeline import Pipeline, Stage
+
+STAGES = [
+    Stage("clean_a", "nb/a.ipynb", inputs=["data/raw_a.csv"], outputs=["data/a.csv"]),
+    Stage("clean_b", "nb/b.ipynb", outputs=["data/b.csv"]),
+    Stage("join", "nb/join.ipynb", inputs=["data/a.csv", "data/b.csv"], outputs=["data/joined.csv"]),
+]
+
+
+def make_tree(root: Path):
+    for rel in ["nb/a.ipynb", "nb/b.ipynb", "nb/join.ipynb", "data/raw_a.csv"]:
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(rel)
+
+
+def fake_execute(log, delay=0.0):
+    lock = threading.Lock()
+
+    def execute(stage, root):
+        with lock:
+            log.append(("start", stage.name))
+        time.sleep(delay)
+        upstream = "".join((root / i).read_text() for i in stage.inputs)
+        for out in stage.outputs:
+            (root / out).write_text(f"{stage.name}({upstream})")
+        with lock:
+            log.append(("end", stage.name))
+    return execute
+
+
+def make_pipeline(root, log, delay=0.0):
+    return Pipeline(STAGES, root=root, cache_path=root / "cache.json", execute=fake_execute(log, delay))
+
+
+# %%
+def test_unchanged_stages_are_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(root)
+        log = []
+        assert set(make_pipeline(root, log).run().values()) == {"ran"}
+
+        log.clear()
+        status = make_pipeline(root, log).run()
+        assert set(status.values()) == {"skipped"}
+        assert log == []
+
+
+def test_changed_input_reruns_downstream_only():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(root)
+        make_pipeline(root, []).run()
+
+        (root / "data/raw_a.csv").write_text("new raw data")
+        status = make_pipeline(root, []).run()
+        assert status == {"clean_a": "ran", "clean_b": "skipped", "join": "ran"}
+
+
+def test_identical_rebuild_stops_propagation():
+    """A rerun that reproduces the same output bytes does not invalidate downstream."""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(root)
+        make_pipeline(root, []).run()
+
+        status = make_pipeline(root, []).run(force=["clean_b"])
+        assert status == {"clean_a": "skipped", "clean_b": "ran", "join": "skipped"}
+
+
+def test_independent_branches_run_concurrently():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(root)
+        log = []
+        make_pipeline(root, log, delay=0.2).run(jobs=2)
+        # Both cleaning stages start before either finishes; join waits for both
+        assert {name for kind, name in log[:2]} == {"clean_a", "clean_b"}
+        assert all(kind == "start" for kind, _ in log[:2])
+        assert log[-2:] == [("start", "join"), ("end", "join")]
+
+
+def test_failed_stage_blocks_downstream():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(root)
+
+        def execute(stage, root):
+            if stage.name == "clean_a":
+                raise RuntimeError("boom")
+            fake_execute([])(stage, root)
+
+        pipeline = Pipeline(STAGES, root=root, cache_path=root / "cache.json", execute=execute)
+        status = pipeline.run()
+        assert status == {"clean_a": "failed", "clean_b": "ran", "join": "blocked"}
+
+
+def test_targets_pull_in_upstream():
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = make_pipeline(Path(tmp), [])
+        assert pipeline.resolve(["join"]) == ["clean_a", "clean_b", "join"]
+        assert pipeline.resolve(["clean_b"]) == ["clean_b"]
+
+
+def test_unknown_stage_names_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = make_pipeline(Path(tmp), [])
+        for kwargs in ({"targets": ["jion"]}, {"force": ["clean_c"]}, {"force": ["clean_c"], "dry_run": True}):
+            try:
+                pipeline.run(**kwargs)
+            except ValueError as e:
+                assert "Unknown stage(s)" in str(e)
+            else:
+                raise AssertionError(f"run({kwargs}) accepted an unknown stage")
+        assert set(pipeline.run(force=["all"], dry_run=True).values()) == {"would run"}
+
+
+# %%
+if __name__ == "__main__":
+    test_unchanged_stages_are_skipped()
+    test_changed_input_reruns_downstream_only()
+    test_identical_rebuild_stops_propagation()
+    test_independent_branches_run_concurrently()
+    test_failed_stage_blocks_downstream()
+    test_targets_pull_in_upstream()
+    test_unknown_stage_names_rejected()
+    print("✅ ALL TESTS PASSED")
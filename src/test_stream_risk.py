@@ -0,0 +1,133 @@
+# %% [markdown]
+# # Validation test for the streaming risk scorer.
+
+# %%
+import json
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from stream_risk import CellRingBuffer, StreamConfig, StreamingRiskScorer, run, tail_file
+
+CATE = pd.DataFrame({
+    "h3_index": ["cell_a", "cell_b", "cell_c"],
+    "cate_mean": [0.010, 0.002, 0.005],
+})
+
+
+# %%
+def test_ring_buffer_matches_rolling_mean():
+    """Ring buffer mean equals the lagged rolling mean from 02_b."""
+    rng = np.random.default_rng(0)
+    counts = rng.poisson(0.3, size=(2, 50))
+    buf = CellRingBuffer(n_cells=2, window=7)
+    expected = (
+        pd.DataFrame(counts.T).shift(1).rolling(7, min_periods=1).mean().to_numpy().T
+    )
+    for t in range(1, 50):
+        buf.push(counts[:, t - 1])
+        assert np.allclose(buf.mean(), expected[:, t])
+
+
+def test_baseline_with_gap_hours():
+    """Hours without events count as zero-crash hours."""
+    scorer = StreamingRiskScorer(CATE, StreamConfig(baseline_window=4))
+    scorer.process({"type": "crash", "datetime": "2025-01-01T00:10", "h3_index": "cell_a"})
+    scorer.process({"type": "crash", "datetime": "2025-01-01T00:20", "h3_index": "cell_a"})
+    # Jump three hours: hour 0 had 2 crashes, hours 1-2 had none
+    out = scorer.process({"type": "weather", "datetime": "2025-01-01T03:00", "precipitation": 0.0})
+    scores = out[-1].scores.set_index("h3_index")
+    assert out[-1].hour == pd.Timestamp("2025-01-01T03:00")
+    assert scores.loc["cell_a", "baseline_risk"] == 2 / 3
+    assert scores.loc["cell_b", "baseline_risk"] == 0
+
+
+def test_alerts_emitted_when_rain_starts():
+    """Rain starting mid-hour emits alerts immediately, ranked by risk."""
+    scorer = StreamingRiskScorer(CATE, StreamConfig(top_n=2))
+    dry = scorer.process({"type": "weather", "datetime": "2025-01-01T05:00", "precipitation": 0.0})
+    assert len(dry) == 1 and dry[0].rain_flag == 0 and dry[0].alerts.empty
+
+    wet = scorer.process({"type": "weather", "datetime": "2025-01-01T05:30", "precipitation": 1.2})
+    assert len(wet) == 1 and wet[0].rain_flag == 1
+    assert wet[0].alerts["h3_index"].tolist() == ["cell_a", "cell_c"]
+
+    # Repeated rain reports within the same hour do not re-emit
+    assert scorer.process({"type": "weather", "datetime": "2025-01-01T05:45", "precipitation": 2.0}) == []
+
+
+def test_unknown_and_late_events_dropped():
+    scorer = StreamingRiskScorer(CATE)
+    scorer.process({"type": "crash", "datetime": "2025-01-01T05:00", "h3_index": "not_tracked"})
+    scorer.process({"type": "traffic", "datetime": "2025-01-01T06:00", "h3_index": "cell_b", "traffic_count": 4})
+    scorer.process({"type": "crash", "datetime": "2025-01-01T04:00", "h3_index": "cell_a"})
+    scorer.process({"type": "bogus"})
+    assert scorer.stats["unknown_cell"] == 1
+    assert scorer.stats["late"] == 1
+    assert scorer.stats["bad_event"] == 1
+    assert scorer.current_counts.sum() == 0
+    assert scorer.flush()[0].scores.set_index("h3_index").loc["cell_b", "traffic_count"] == 4
+
+
+def test_traffic_reset_each_hour():
+    scorer = StreamingRiskScorer(CATE)
+    scorer.process({"type": "traffic", "datetime": "2025-01-01T05:00", "h3_index": "cell_b", "traffic_count": 4})
+    out = scorer.process({"type": "weather", "datetime": "2025-01-01T06:00", "precipitation": 0.0})
+    assert np.isnan(out[-1].scores.set_index("h3_index").loc["cell_b", "traffic_count"])
+
+
+def test_partial_and_bad_records_skipped():
+    """A half-written line waits for its newline; malformed records are counted, not fatal."""
+    weather = json.dumps({"type": "weather", "datetime": "2025-01-01T05:00", "precipitation": 0.0})
+    crash = json.dumps({"type": "crash", "datetime": "2025-01-01T05:10", "h3_index": "cell_a"})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/events.jsonl"
+        with open(path, "w") as f:
+            f.write(weather + "\n" + crash[:20])
+        events = tail_file(path, follow=True, poll_interval=0.01)
+        assert next(events)["type"] == "weather"
+        with open(path, "a") as f:
+            f.write(crash[20:] + "\n")
+        assert next(events)["h3_index"] == "cell_a"
+        events.close()
+
+        scorer = StreamingRiskScorer(CATE)
+        bad = [
+            {"type": "crash", "datetime": "", "h3_index": "cell_a"},  # first event: must not set the clock
+            {"type": "crash", "datetime": None, "h3_index": "cell_a"},
+            {"type": "weather", "datetime": "2025-01-01T05:20", "precipitation": "n/a"},
+            {"type": "weather", "datetime": "2025-01-01T05:20", "precipitation": float("nan")},
+            {"type": "weather", "datetime": "2025-01-01T05:20", "precipitation": "1e999"},
+            {"type": "traffic", "datetime": "2025-01-01T05:30", "h3_index": "cell_b", "traffic_count": "inf"},
+        ]
+        with open(path, "w") as f:
+            f.write(json.dumps(bad[0]) + "\n")
+            f.write(crash + "\n")
+            # UTC timestamp: 10:10Z is 05:10 in New York
+            f.write(json.dumps({"type": "crash", "datetime": "2025-01-01T10:10Z", "h3_index": "cell_a"}) + "\n")
+            for event in bad[1:]:
+                f.write(json.dumps(event) + "\n")
+            f.write(crash[:20] + "\n")
+            f.write(crash[:20])  # writer died mid-line
+        results = []
+        run(tail_file(path, follow=False, stats=scorer.stats), scorer, results.append)
+
+    assert scorer.stats["bad_event"] == 8
+    assert scorer.stats["events"] == 8
+    assert scorer.stats["late"] == 0
+    assert len(results) == 1 and results[0].hour == pd.Timestamp("2025-01-01T05:00")
+    assert results[0].rain_flag == 0 and results[0].precipitation == 0.0
+    assert np.isnan(results[0].scores.set_index("h3_index").loc["cell_b", "traffic_count"])
+    assert scorer.history.mean()[0] == 2
+
+
+# %%
+if __name__ == "__main__":
+    test_ring_buffer_matches_rolling_mean()
+    test_baseline_with_gap_hours()
+    test_alerts_emitted_when_rain_starts()
+    test_unknown_and_late_events_dropped()
+    test_traffic_reset_each_hour()
+    test_partial_and_bad_records_skipped()
+    print("✅ ALL TESTS PASSED")
@@ -0,0 +1,64 @@
+# %% [markdown]
+# # Validation test for the synthetic data generator and benchmark suite.
+
+# %%
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import add_baseline_risk, build_full_panel, merge_traffic, merge_weather, run_scale
+from synthetic_data import SyntheticConfig, config_for_scale, generate
+
+
+# %%
+def test_sparsity_matches_real_data():
+    cfg = SyntheticConfig(n_cells=300, n_hours=24 * 365)
+    data = generate(cfg)
+    crash_hours = data["panel"]["accident_indicator"].mean()
+    rain_hours = data["weather"]["rain_flag"].mean()
+    assert 0.006 < crash_hours < 0.010, crash_hours
+    assert 0.08 < rain_hours < 0.14, rain_hours
+    assert len(data["panel"]) == cfg.n_rows
+
+
+def test_generation_is_seeded():
+    cfg = config_for_scale("10K")
+    a, b = generate(cfg), generate(cfg)
+    pd.testing.assert_frame_equal(a["crashes"], b["crashes"])
+    pd.testing.assert_frame_equal(a["traffic"], b["traffic"])
+    c = generate(config_for_scale("10K", seed=7))
+    assert not a["crashes"]["h3"].equals(c["crashes"]["h3"])
+
+
+def test_numpy_panel_matches_notebook_chain():
+    """make_panel's vectorized Baseline_Risk / traffic agree with the 02_b + 05 pandas code."""
+    cfg = SyntheticConfig(n_cells=80, n_hours=24 * 30, crash_rate=0.05)
+    data = generate(cfg)
+    chain = build_full_panel(data["dense"], data["weather"])
+    chain = merge_traffic(merge_weather(add_baseline_risk(chain), data["weather"]), data["traffic"])
+    chain["Baseline_Risk"] = chain["Baseline_Risk"].fillna(0)
+
+    panel = data["panel"].assign(h3_index=data["panel"]["h3_index"].astype(str))
+    merged = chain.merge(panel, on=["h3_index", "datetime"], suffixes=("_chain", "_np"))
+    assert len(merged) == len(chain)
+    for col in ["accidents_count", "Baseline_Risk", "rain_flag", "is_rush_hour", "traffic_count"]:
+        assert np.allclose(merged[f"{col}_chain"], merged[f"{col}_np"], atol=1e-5), col
+
+
+def test_benchmark_suite_writes_report():
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_scale("10K", only=["baseline_risk"], report_dir=Path(tmp))
+        names = [m.name for m in report.stages]
+        assert names == ["generate", "panel_construction", "baseline_risk"]
+        assert report.save().exists()
+
+
+# %%
+if __name__ == "__main__":
+    test_sparsity_matches_real_data()
+    test_generation_is_seeded()
+    test_numpy_panel_matches_notebook_chain()
+    test_benchmark_suite_writes_report()
+    print("✅ ALL TESTS PASSED")
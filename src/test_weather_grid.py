@@ -0,0 +1,126 @@
+# %% [markdown]
+# # Validation test for gridded per-cell weather, against a local stub of the Open-Meteo API.
+
+# %%
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import h3
+import numpy as np
+import pandas as pd
+
+from weather_grid import (
+    attach_cell_weather,
+    fetch_grid,
+    idw_weights,
+    interpolate_cells,
+    load_weather_grid,
+    make_grid,
+    save_weather_grid,
+)
+
+N_HOURS = 48
+
+
+class StubOpenMeteo(BaseHTTPRequestHandler):
+    """Precipitation = latitude-dependent constant, so interpolation is checkable."""
+    requests_seen = []
+
+    def do_GET(self):
+        q = parse_qs(urlparse(self.path).query)
+        lats = [float(x) for x in q["latitude"][0].split(",")]
+        lons = [float(x) for x in q["longitude"][0].split(",")]
+        StubOpenMeteo.requests_seen.append(len(lats))
+        times = pd.date_range(q["start_date"][0], periods=N_HOURS, freq="h").strftime("%Y-%m-%dT%H:%M").tolist()
+        results = [
+            {"latitude": lat, "longitude": lon,
+             "hourly": {"time": times, "precipitation": [round((lat - 40.0) * 10, 3)] * N_HOURS}}
+            for lat, lon in zip(lats, lons)
+        ]
+        body = json.dumps(results if len(results) > 1 else results[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = HTTPServer(("127.0.0.1", 0), StubOpenMeteo)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1/archive"
+
+
+# %%
+def test_batched_fetch_and_cache_reuse():
+    server, url = start_stub()
+    StubOpenMeteo.requests_seen = []
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            coarse = make_grid(0.1)
+            times, precip = fetch_grid(coarse, "2024-06-01", "2024-06-02", url, cache_dir, batch_size=20, pause=0)
+            assert precip.shape == (len(coarse), N_HOURS)
+            assert len(times) == N_HOURS
+            assert StubOpenMeteo.requests_seen == [20, 20, 16]
+
+            # Same grid again: everything cached
+            StubOpenMeteo.requests_seen = []
+            _, again = fetch_grid(coarse, "2024-06-01", "2024-06-02", url, cache_dir, pause=0)
+            assert StubOpenMeteo.requests_seen == []
+            assert np.array_equal(precip, again)
+
+            # Finer grid only fetches the new points
+            fine = make_grid(0.05)
+            StubOpenMeteo.requests_seen = []
+            fetch_grid(fine, "2024-06-01", "2024-06-02", url, cache_dir, batch_size=1000, pause=0)
+            assert StubOpenMeteo.requests_seen == [len(fine) - len(coarse)]
+    finally:
+        server.shutdown()
+
+
+def test_idw_interpolation():
+    points = np.array([[40.6, -74.0], [40.8, -74.0], [40.7, -73.8]])
+    precip = np.array([[1.0, 0.0], [3.0, 0.0], [np.nan, 0.0]], dtype=np.float32)
+    targets = np.array([[40.6, -74.0], [40.7, -74.0]])
+    weights = idw_weights(targets, points, k=3)
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert np.allclose(weights[0], [1.0, 0.0, 0.0])  # exactly on a grid point
+
+    cell = interpolate_cells(weights, precip)
+    assert cell[0, 0] == 1.0
+    # Midway between the two valid points; the NaN point is dropped from the mix
+    assert np.isclose(cell[1, 0], 2.0, atol=1e-3)
+
+
+def test_attach_cell_weather_joins_by_index():
+    cells = [h3.latlng_to_cell(40.58, -74.15, 8), h3.latlng_to_cell(40.85, -73.87, 8)]  # Staten Island, Bronx
+    times = pd.date_range("2024-06-01", periods=3, freq="h")
+    precip = np.array([[0.0, 0.5, 0.0], [2.0, 0.0, 0.05]], dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/grid.npz"
+        save_weather_grid(path, cells, times, precip)
+        grid = load_weather_grid(path)
+
+    panel = pd.DataFrame({
+        "h3_index": [cells[0], cells[1], cells[1], "unknown", cells[0]],
+        "date": ["2024-06-01"] * 4 + ["2024-06-02"],
+        "hour": [1, 0, 2, 0, 0],
+    })
+    out = attach_cell_weather(panel, grid)
+    assert out["precipitation"].iloc[:3].tolist() == [0.5, 2.0, np.float32(0.05)]
+    assert out["rain_flag"].tolist() == [1, 1, 0, 0, 0]
+    assert out["precipitation"].iloc[3:].isna().all()
+
+
+# %%
+if __name__ == "__main__":
+    test_batched_fetch_and_cache_reuse()
+    test_idw_interpolation()
+    test_attach_cell_weather_joins_by_index()
+    print("✅ ALL TESTS PASSED")
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Gridded Per-Cell Weather
+========================
+
+03_weather fetches a single Open-Meteo series at (40.7128, -74.0060) and 02_b
+broadcasts it to every cell through the (date, hour) merge, so rain on Staten
+Island and in the Bronx is identical. This script gives each H3 cell its own
+series instead:
+
+1. Lay a coarse grid of points over the NYC bounding box (from 01).
+2. Fetch hourly precipitation for the grid in batched multi-location requests,
+   caching every point on disk. The grid is anchored at fixed corners, so a
+   finer grid reuses every cached point of a coarser one.
+3. Assign each cell an inverse-distance-weighted (IDW) mix of its nearest grid
+   points, as one (n_cells, n_points) weight matrix product.
+4. Save a compact (n_cells, n_hours) float32 precipitation array that the
+   panel build joins by index (see `attach_cell_weather`).
+
+Usage:
+    python weather_grid.py --cells ../data/h3_panel_res8.csv --spacing 0.1
+    python weather_grid.py --cells ../data/h3_panel_res8.csv --spacing 0.05   # reuses cached 0.1 points
+
+Testing against a local stub API:
+    python weather_grid.py --cells ... --url http://localhost:8000/v1/archive
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import h3
+import numpy as np
+import pandas as pd
+import requests
+
+# Configuration
+API_URL = "https://archive-api.open-meteo.com/v1/archive"
+CACHE_DIR = "../data/weather_cache"
+OUTPUT_PATH = "../data/nyc_weather_grid.npz"
+START_DATE = "2022-01-01"
+END_DATE = "2025-11-27"
+TIMEZONE = "America/New_York"
+RAIN_THRESHOLD = 0.1  # mm, same as 03_weather
+
+# Grid extent: the NYC bounding box from 01_data_cleaning
+# (40.477..40.917 N, -74.259..-73.700 E) padded out to whole tenths of a degree
+GRID_LAT_MIN, GRID_LAT_MAX = 40.4, 41.0
+GRID_LON_MIN, GRID_LON_MAX = -74.3, -73.6
+GRID_SPACING = 0.1   # degrees (~11 km north-south)
+BATCH_SIZE = 20      # locations per API request
+IDW_POWER = 2
+IDW_NEIGHBORS = 4
+EARTH_RADIUS_KM = 6371.0
+
+
+# -----------------------------
+# Grid
+# -----------------------------
+def make_grid(spacing: float = GRID_SPACING) -> np.ndarray:
+    """
+    (n_points, 2) lat/lon grid covering the NYC bounding box.
+
+    The grid is anchored at the fixed GRID_* corners, so for any spacing that
+    divides 0.1° (0.05, 0.025, ...) a finer grid contains every point of the
+    coarser one (and reuses its cache entry).
+    """
+    n_lat = int(round((GRID_LAT_MAX - GRID_LAT_MIN) / spacing))
+    n_lon = int(round((GRID_LON_MAX - GRID_LON_MIN) / spacing))
+    lat = GRID_LAT_MIN + np.arange(n_lat + 1) * spacing
+    lon = GRID_LON_MIN + np.arange(n_lon + 1) * spacing
+    lat, lon = np.meshgrid(lat, lon, indexing="ij")
+    return np.round(np.column_stack([lat.ravel(), lon.ravel()]), 4)
+
+
+def cell_centroids(cells: Sequence[str]) -> np.ndarray:
+    """(n_cells, 2) lat/lon centroids of H3 cells."""
+    return np.array([h3.cell_to_latlng(c) for c in cells], dtype=float).reshape(-1, 2)
+
+
+# -----------------------------
+# Fetching with a per-point cache
+# -----------------------------
+class PointCache:
+    """One JSON file per (point, date range) holding the hourly series."""
+
+    def __init__(self, cache_dir: str, start: str, end: str):
+        self.dir = Path(cache_dir)
+        self.start, self.end = start, end
+
+    def path(self, lat: float, lon: float) -> Path:
+        return self.dir / f"{lat:.4f}_{lon:.4f}_{self.start}_{self.end}.json"
+
+    def get(self, lat: float, lon: float) -> Optional[dict]:
+        path = self.path(lat, lon)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def put(self, lat: float, lon: float, series: dict) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(lat, lon)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(series, f)
+        tmp.replace(path)
+
+
+def fetch_batch(
+    points: np.ndarray,
+    start: str,
+    end: str,
+    url: str = API_URL,
+    session: Optional[requests.Session] = None,
+) -> List[dict]:
+    """
+    One multi-location Open-Meteo request. Returns `{"time": [...],
+    "precipitation": [...]}` per point, in the order of `points`.
+    """
+    params = {
+        "latitude": ",".join(f"{lat:.4f}" for lat in points[:, 0]),
+        "longitude": ",".join(f"{lon:.4f}" for lon in points[:, 1]),
+        "start_date": start,
+        "end_date": end,
+        "hourly": "precipitation",
+        "timezone": TIMEZONE,
+    }
+    response = (session or requests).get(url, params=params, timeout=60)
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to fetch weather data ({response.status_code}): {response.text[:200]}")
+
+    data = response.json()
+    # A single location comes back as an object, several as a list
+    results = data if isinstance(data, list) else [data]
+    if len(results) != len(points):
+        raise RuntimeError(f"Expected {len(points)} locations in response, got {len(results)}")
+    return [{"time": r["hourly"]["time"], "precipitation": r["hourly"]["precipitation"]} for r in results]
+
+
+def fetch_grid(
+    points: np.ndarray,
+    start: str = START_DATE,
+    end: str = END_DATE,
+    url: str = API_URL,
+    cache_dir: str = CACHE_DIR,
+    batch_size: int = BATCH_SIZE,
+    pause: float = 1.0,
+) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    Hourly precipitation for every grid point, fetching only uncached points.
+
+    Returns:
+        times: hourly timestamps (local time, as returned by the API)
+        precip: (n_points, n_hours) float32 array, NaN where the API had no value
+    """
+    cache = PointCache(cache_dir, start, end)
+    series: Dict[int, dict] = {}
+    missing = []
+    for i, (lat, lon) in enumerate(points):
+        cached = cache.get(lat, lon)
+        if cached is None:
+            missing.append(i)
+        else:
+            series[i] = cached
+
+    print(f"Weather grid: {len(points)} points, {len(points) - len(missing)} cached, {len(missing)} to fetch")
+    with requests.Session() as session:
+        for b, lo in enumerate(range(0, len(missing), batch_size)):
+            if b > 0 and pause > 0:
+                time.sleep(pause)  # be polite to the free API
+            idx = missing[lo:lo + batch_size]
+            for i, result in zip(idx, fetch_batch(points[idx], start, end, url, session)):
+                cache.put(points[i, 0], points[i, 1], result)
+                series[i] = result
+            print(f"  ✓ fetched batch {b + 1} ({len(idx)} points)")
+
+    times = pd.DatetimeIndex(pd.to_datetime(series[0]["time"])) if series else pd.DatetimeIndex([])
+    precip = np.full((len(points), len(times)), np.nan, dtype=np.float32)
+    for i, s in series.items():
+        if len(s["precipitation"]) != len(times):
+            raise ValueError(f"Grid point {points[i].tolist()} has {len(s['precipitation'])} hours, expected {len(times)}")
+        precip[i] = np.array(s["precipitation"], dtype=float)
+    return times, precip
+
+
+# -----------------------------
+# Inverse-distance weighting
+# -----------------------------
+def haversine_km(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle distances between (n, 2) and (m, 2) lat/lon arrays."""
+    lat1, lon1 = np.radians(a[:, 0])[:, None], np.radians(a[:, 1])[:, None]
+    lat2, lon2 = np.radians(b[:, 0])[None, :], np.radians(b[:, 1])[None, :]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+
+def idw_weights(
+    targets: np.ndarray,
+    points: np.ndarray,
+    power: float = IDW_POWER,
+    k: int = IDW_NEIGHBORS,
+) -> np.ndarray:
+    """
+    (n_targets, n_points) row-normalized IDW weights using the `k` nearest
+    points. A target that sits on a grid point takes that point's value.
+    """
+    dist = haversine_km(targets, points)
+    k = min(k, points.shape[0])
+    nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    rows = np.arange(len(targets))[:, None]
+
+    d = dist[rows, nearest]
+    with np.errstate(divide="ignore"):
+        w = 1.0 / d ** power
+    exact = d == 0
+    has_exact = exact.any(axis=1)
+    w[has_exact] = exact[has_exact].astype(float)
+
+    weights = np.zeros_like(dist)
+    weights[rows, nearest] = w / w.sum(axis=1, keepdims=True)
+    return weights
+
+
+def interpolate_cells(weights: np.ndarray, precip: np.ndarray) -> np.ndarray:
+    """
+    (n_cells, n_hours) precipitation. Points with a missing hour are dropped
+    from that hour's mix and the remaining weights renormalized.
+    """
+    valid = ~np.isnan(precip)
+    weights = weights.astype(np.float32)
+    num = weights @ np.where(valid, precip, 0.0).astype(np.float32)
+    den = weights @ valid.astype(np.float32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = num / den
+    return out.astype(np.float32)
+
+
+# -----------------------------
+# Output & panel join
+# -----------------------------
+def save_weather_grid(path: str, cells: Sequence[str], times: pd.DatetimeIndex, precip: np.ndarray) -> None:
+    """Compact on-disk format: cell ids, hourly timestamps, (n_cells, n_hours) float32."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path,
+        h3_index=np.asarray(cells, dtype=str),
+        times=times.values.astype("datetime64[s]").astype(np.int64),
+        precipitation=precip.astype(np.float32),
+    )
+
+
+def load_weather_grid(path: str) -> dict:
+    with np.load(path) as f:
+        return {
+            "h3_index": pd.Index(f["h3_index"]),
+            "times": pd.DatetimeIndex(f["times"].astype("datetime64[s]")),
+            "precipitation": f["precipitation"],
+        }
+
+
+def attach_cell_weather(
+    panel: pd.DataFrame,
+    grid: dict,
+    h3_col: str = "h3_index",
+    rain_threshold: float = RAIN_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Add per-cell `precipitation` and `rain_flag` to a panel with `h3_index`,
+    `date` and `hour` columns, by array indexing instead of a merge.
+    Cell-hours outside the grid get NaN precipitation and rain_flag 0.
+    """
+    row = grid["h3_index"].get_indexer(panel[h3_col])
+    stamps = pd.to_datetime(panel["date"]) + pd.to_timedelta(panel["hour"], unit="h")
+    # Local-time series can repeat an hour at the DST switch; keep the first, like a (date, hour) lookup
+    hour_pos = pd.Series(np.arange(len(grid["times"])), index=grid["times"])
+    hour_pos = hour_pos[~hour_pos.index.duplicated()]
+    col = hour_pos.reindex(stamps).fillna(-1).to_numpy(dtype=np.int64)
+
+    ok = (row >= 0) & (col >= 0)
+    precip = np.full(len(panel), np.nan, dtype=np.float32)
+    precip[ok] = grid["precipitation"][row[ok], col[ok]]
+
+    panel = panel.copy()
+    panel["precipitation"] = precip
+    panel["rain_flag"] = (precip > rain_threshold).astype(int)
+    return panel
+
+
+def load_cells(path: str) -> List[str]:
+    """Unique H3 cells from any pipeline CSV with an h3 column."""
+    df = pd.read_csv(path, usecols=lambda c: c in ("h3_index", "h3_cell", "h3"))
+    col = next(c for c in ("h3_index", "h3_cell", "h3") if c in df.columns)
+    return sorted(df[col].dropna().unique())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a per-H3-cell hourly precipitation array.")
+    parser.add_argument("--cells", required=True, help="CSV with an h3_index / h3 column (e.g. h3_panel_res8.csv)")
+    parser.add_argument("--spacing", type=float, default=GRID_SPACING, help="grid spacing in degrees")
+    parser.add_argument("--start", default=START_DATE)
+    parser.add_argument("--end", default=END_DATE)
+    parser.add_argument("--url", default=API_URL, help="Open-Meteo archive endpoint (or a local stub)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    cells = load_cells(args.cells)
+    points = make_grid(args.spacing)
+    print(f"Cells: {len(cells):,}  Grid points: {len(points)} (spacing {args.spacing}°)")
+
+    times, precip = fetch_grid(points, args.start, args.end, args.url, args.cache_dir, args.batch_size)
+    weights = idw_weights(cell_centroids(cells), points)
+    cell_precip = interpolate_cells(weights, precip)
+    save_weather_grid(args.out, cells, times, cell_precip)
+
+    rain = cell_precip > RAIN_THRESHOLD
+    print(f"✓ Saved {cell_precip.shape} precipitation array to {args.out}")
+    print(f"  Rain cell-hours: {np.nanmean(rain)*100:.2f}%")
+    print(f"  Hours where cells disagree on rain: {(rain.any(axis=0) & ~rain.all(axis=0)).mean()*100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()